@@ -1,19 +1,225 @@
 import uuid
-from functools import wraps
 import math
+from enum import IntEnum
+from functools import lru_cache
 
-import matplotlib.pyplot as plt
 import numpy as np
 
-from utils import Cell, SmartsheetRow, get_smartsheet_col_by_id
+from utils import Cell, SmartsheetRow, build_col_index, get_smartsheet_col_by_id
+
+try:
+    from numba import guvectorize, njit
+    HAS_NUMBA = True
+except ImportError:  # numba is optional, CashFlow falls back to its numpy profiles
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+
+# numba fastmath flags for the profile kernel. nnan/ninf are left out because a steep sigmoid can
+# legitimately overflow exp() to inf, contract/reassoc because fusing m * x + b no longer cancels to
+# exactly 0 at the end of the delay
+_FASTMATH = {'nsz', 'arcp', 'afn'}
+
+# sigmoids reach 95% of their range at the end of the scale up period, see CashFlow._sigmoid_constants
+_SIGMOID_LOG = math.log(1/.95 - 1)
+
+
+class Profile(IntEnum):
+    """Cash flow profile types. The values double as the compiled kernel's dispatch ids"""
+    SIGMOID = 0
+    LINEAR = 1
+    STEP = 2
+    SINGLE = 3
+
+    @classmethod
+    def parse(cls, value):
+        """accepts a Profile or its name in any case, e.g. 'sigmoid'"""
+        if isinstance(value, cls):
+            return value
+        if not isinstance(value, str):
+            raise Exception(f'Unknown profile type: {value}')
+        try:
+            return cls[value.strip().upper()]
+        except KeyError:
+            raise Exception(f'Unknown profile type: {value}') from None
 
 
 def discount(val, discount_rate, period_n):
+    """discounts val back period_n periods, any argument may be an array, e.g. np.arange(12)"""
     return val / ((1 + discount_rate) ** period_n)
 
 
+def discount_factors(discount_rate, periods):
+    """returns [1, 1/(1+r), 1/(1+r)^2, ...] for `periods` periods, built by rolling multiplication"""
+    factors = np.full(periods, 1 / (1 + discount_rate))
+    factors[:1] = 1.0
+    return np.cumprod(factors)
+
+
+@lru_cache(maxsize=16)
+def _periods(tot_qtrs):
+    """(periods, periods_index, periods_labels) tuples, shared by every CashFlow of the same length"""
+    return (
+        tuple(range(1, tot_qtrs + 1)),
+        tuple(range(tot_qtrs)),
+        tuple('Q' + str(q) for q in range(1, tot_qtrs + 1)),
+    )
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _compute_profile(tot_qtrs, delay, scale, max_amt, start_amt, r, is_cost, fn_id, discounted):
+    """Loop form of the CashFlow profiles (see CashFlow._sigmoid etc.) for numba to compile"""
+    values = np.empty(tot_qtrs)
+    amt_range = max_amt - start_amt
+    multiplier = -1.0 if is_cost else 1.0
+    x_naught = 0.0
+    k = 0.0
+    m = 0.0
+    b = 0.0
+    if fn_id == 0:  # Profile.SIGMOID
+        x_naught = delay + scale / 2
+        k = _SIGMOID_LOG / (x_naught - (delay + scale))
+    elif fn_id == 1:  # Profile.LINEAR
+        m = amt_range / scale
+        b = -m * delay
+
+    disc = 1.0
+    disc_step = 1.0 / (1 + r)
+    for quarter_n in range(tot_qtrs):
+        if quarter_n < delay:
+            values[quarter_n] = 0.0
+        else:
+            if fn_id == 0:  # Profile.SIGMOID
+                amt = min(amt_range / (1 + math.exp(-k * (quarter_n - x_naught))), amt_range)
+            elif fn_id == 1:  # Profile.LINEAR
+                amt = min(m * quarter_n + b, amt_range)
+            elif fn_id == 2:  # Profile.STEP
+                amt = amt_range
+            else:  # Profile.SINGLE
+                amt = amt_range if quarter_n == delay else -1 * start_amt
+
+            amt = multiplier * (amt + start_amt)
+            if discounted:
+                amt = amt * disc
+            values[quarter_n] = amt
+        disc *= disc_step
+    return values
+
+
+@lru_cache(maxsize=1)
+def _profile_batch_kernel():
+    """_compute_profile broadcast over flows, built on first use since guvectorize compiles its signature
+    eagerly and would slow down every import"""
+    @guvectorize(
+        ['void(float64[:], float64, float64, float64, float64, float64, boolean, int64, boolean, float64[:])'],
+        '(n),(),(),(),(),(),(),(),()->(n)',
+        target='parallel', nopython=True, fastmath=_FASTMATH, cache=True
+    )
+    def kernel(quarters, delay, scale, max_amt, start_amt, r, is_cost, fn_id, discounted, out):
+        # `quarters` only carries the output length
+        out[:] = _compute_profile(
+            quarters.shape[0], delay, scale, max_amt, start_amt, r, is_cost, fn_id, discounted
+        )
+    return kernel
+
+
+def _compute_profile_block(tot_qtrs, delays, scales, maxes, starts, rates, is_costs, fn_ids, discounted):
+    """numpy form of _compute_profile for many flows at once, one (flows, tot_qtrs) block per step"""
+    delays, scales, maxes, starts, rates = (a[:, np.newaxis] for a in (delays, scales, maxes, starts, rates))
+    x = np.arange(tot_qtrs, dtype=float)
+    amt_range = maxes - starts
+    values = np.empty((delays.shape[0], tot_qtrs))
+
+    rows = fn_ids == Profile.SIGMOID
+    if rows.any():
+        x_naught = delays[rows] + scales[rows] / 2
+        k = _SIGMOID_LOG / (x_naught - (delays[rows] + scales[rows]))
+        with np.errstate(over='ignore'):  # a steep sigmoid may overflow exp() to inf, giving 0
+            values[rows] = np.minimum(amt_range[rows] / (1 + np.exp(-k * (x - x_naught))), amt_range[rows])
+    rows = fn_ids == Profile.LINEAR
+    if rows.any():
+        m = amt_range[rows] / scales[rows]
+        values[rows] = np.minimum(m * x + -m * delays[rows], amt_range[rows])
+    rows = fn_ids == Profile.STEP
+    values[rows] = amt_range[rows]
+    rows = fn_ids == Profile.SINGLE
+    values[rows] = np.where(x == delays[rows], amt_range[rows], -starts[rows])
+
+    values += starts
+    values *= np.where(is_costs, -1.0, 1.0)[:, np.newaxis]
+    if discounted:
+        # same rolling multiplication as discount_factors, one row per rate
+        steps = np.repeat(1 / (1 + rates), tot_qtrs, axis=1)
+        steps[:, :1] = 1.0
+        values *= np.cumprod(steps, axis=1)
+    values[x < delays] = 0.0  # nothing happens until the delay is over
+    return values
+
+
+def compute_profile_batch(delays, scales, maxes, starts, rates, is_costs, profiles, tot_qtrs, discounted=True):
+    """Evaluates many flows (see CashFlow._calculate_qtr) in one call, in parallel when numba is installed
+    and as one numpy block (a single np.exp for every sigmoid) otherwise
+
+    Args:
+        delays, scales, maxes, starts (array-like): per flow delay_qtrs, scale_up_qtrs, max and
+            start amounts
+        rates (array-like): per flow quarterly discount rates, i.e. CashFlow.discount_rate
+        is_costs (array-like): per flow is_cost flags
+        profiles (array-like): per flow Profile
+        tot_qtrs (int): number of quarters to evaluate
+        discounted (boolean): whether to discount the values (default True)
+
+    Returns:
+        ndarray of shape (flows, tot_qtrs)
+    """
+    params = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(a, dtype=float)) for a in (delays, scales, maxes, starts, rates)),
+        np.atleast_1d(np.asarray(is_costs, dtype=bool)),
+        np.atleast_1d(np.asarray(profiles, dtype=np.int64)),
+    )
+    if HAS_NUMBA:
+        # ufuncs report floating point flags, and fastmath lets the compiler speculate the guarded
+        # sigmoid/linear divisions for step flows whose scale is 0, the values themselves are unaffected
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return _profile_batch_kernel()(np.empty(tot_qtrs), *params, bool(discounted))
+
+    return _compute_profile_block(tot_qtrs, *params, bool(discounted))
+
+
 class CashFlowBase():
     """Ensure all children implement the following methods"""
+    __slots__ = ()
+
+    def _memoized(self, key, compute, *args):
+        """returns the cached array for `key`, on a miss `compute(*args)` is stored read-only"""
+        values = self._cache.get(key)
+        if values is None:
+            values = np.asarray(compute(*args), dtype=float)
+            values.flags.writeable = False
+            self._cache[key] = values
+        return values
+
+    def __copy__(self):
+        """shallow copy with its own cache, so reassigning the copy's inputs leaves the original alone"""
+        flow = object.__new__(type(self))
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if hasattr(self, name):
+                    object.__setattr__(flow, name, getattr(self, name))
+        object.__setattr__(flow, '_cache', dict(self._cache))  # the cached arrays are read-only, share them
+        return flow
+
+    # list accessor name -> function returning the memoized ndarray it is built from, see qtr_array
+    _QTR_ARRAYS = {}
+
+    def qtr_array(self, attribute):
+        """read-only ndarray of the accessor `attribute`, e.g. 'discounted_qtr', without the list copy"""
+        try:
+            return self._QTR_ARRAYS[attribute](self)
+        except KeyError:
+            return np.asarray(getattr(self, attribute), dtype=float)
 
     @property
     def non_discounted_qtr(self):
@@ -55,14 +261,15 @@ class CashFlow(CashFlowBase):
         max_amt (float): Unitless amount that profile can scale up to
         scale_up_qtrs (int): How many quarters it takes to scale up a cash
             flow.
-        function (string): Profile type of cash flow
+        function (Profile | string): Profile type of cash flow, names such as 'sigmoid' are
+            converted to the matching Profile
     
     Keyword arguments:
         start_amt (float): Unitless amont that profile stars at after delay
             period.
         name (string): Descriptive name of the cash flow (default '')
         flow_id (UUID): A unique identifier for the cash flow. This is only
-            important deletes become a thing (default UUID).
+            important deletes become a thing (default a new UUID per instance).
         tot_qtrs (int): Total number of quarters the profile will run over.
             Essentially dictates the length of the resulting data output
             (default 12).
@@ -75,117 +282,181 @@ class CashFlow(CashFlowBase):
         * `discounted` attritubte should exist, but be private. `qtr` should also
           be private (_qtr). The idea of a cash flow holding state is a flaw.
         * args/kwargs should be validated
-        * function profile types should be class attributes, e.g. CashFlow.SIGMOIDs
     """
+    __slots__ = (
+        '_cache', '_sig_k', '_sig_x0', 'delay_qtrs', 'digital_gallons', 'discount_rate', 'function', 'id',
+        'is_cost', 'max_amt', 'name', 'periods', 'periods_index', 'periods_labels', 'scale_up_qtrs',
+        'start_amt', 'tot_qtrs', 'vc_per_dg',
+    )
+
+    # attributes the quarterly profiles are derived from, changing one invalidates the cache
+    _CACHE_ATTRS = frozenset([
+        'delay_qtrs', 'digital_gallons', 'discount_rate', 'function', 'is_cost', 'max_amt',
+        'scale_up_qtrs', 'start_amt', 'tot_qtrs', 'vc_per_dg',
+    ])
+
+    _QTR_ARRAYS = {
+        'non_discounted_qtr': lambda cf: cf._calculate_qtr(cf.function, False),
+        'discounted_qtr': lambda cf: cf._calculate_qtr(cf.function, True),
+        'non_discounted_dg_qtr': lambda cf: cf._calculate_dg_qtr(cf.function, False),
+        'discounted_dg_qtr': lambda cf: cf._calculate_dg_qtr(cf.function, True),
+        'non_discounted_vc_qtr': lambda cf: cf._calculate_vc_qtr(False),
+        'discounted_vc_qtr': lambda cf: cf._calculate_vc_qtr(True),
+    }
+
     def __init__(self, delay_qtrs, digital_gallons, discount_rate, is_cost, max_amt, scale_up_qtrs,
-                 function, vc_per_dg, start_amt=0, name='', flow_id=uuid.uuid4(), tot_qtrs=12):
+                 function, vc_per_dg, start_amt=0, name='', flow_id=None, tot_qtrs=12):
         # I don't like this, as this is typically something the parser should handle; however,
         # we need to assert that scale_up_qtrs doesn't cause bad mathematical results
-        if function != 'step' and scale_up_qtrs < 2: 
+        function = Profile.parse(function)
+        if function != Profile.STEP and scale_up_qtrs < 2: 
             raise Exception('the total number of quarters must be at least one')
 
+        self._cache = {}  # (kind, Profile, discounted) -> read-only ndarray, see _memoized
+        self._sig_k = self._sig_x0 = None  # sigmoid constants, see _sigmoid_constants
         self.delay_qtrs = delay_qtrs
         self.digital_gallons = digital_gallons
         self.discount_rate = discount_rate / 4 # annual discount rate -> quarterly
         self.function = function # Will interpret an instance according to this setting
-        self.id = flow_id
+        self.id = flow_id if flow_id is not None else uuid.uuid4()
         self.is_cost = is_cost
         self.max_amt = max_amt
         self.name = name
         self.scale_up_qtrs = scale_up_qtrs
         self.start_amt = start_amt
         self.vc_per_dg = vc_per_dg
-        self.tot_qtrs = tot_qtrs  # TODO: rename to "period"
-        self.periods = list(range(1, tot_qtrs + 1))
-        self.periods_index = list(range(tot_qtrs))
-        self.periods_labels = ['Q' + str(q) for q in range(1, self.tot_qtrs + 1)]
-
-    def _sigmoid(self, x, max_amt, start_amt):
+        self.tot_qtrs = tot_qtrs  # TODO: rename to "period", also sets periods, see __setattr__
+
+    def __setattr__(self, name, value):
+        if name == 'function':
+            value = Profile.parse(value)
+        if name in self._CACHE_ATTRS:
+            self.invalidate_cache()
+        super().__setattr__(name, value)
+        if name == 'tot_qtrs':
+            # keep the period sequences the same length as the profiles
+            self.periods, self.periods_index, self.periods_labels = _periods(value)
+
+    def invalidate_cache(self):
+        """drops memoized quarter values and profile constants, they are recalculated on next access"""
+        self._cache.clear()
+        self._sig_k = self._sig_x0 = None
+
+    def _sigmoid_constants(self):
         """
         We define y at 95% max at end of delay and scale up period 
         y = .95L = L / (1 + e^-k(x_end - x_naught)) # https://en.wikipedia.org/wiki/Logistic_function
         For us, this means the scaling factor (k) is
         k = ln(1/.95 - 1)/((delay_qtrs + scale_up_qtrs/2) - (delay_qtrs + scale_up_qtrs))
         """
-        # 1 / 2 scale_up_qtrs to place x_naught at vertical of sigmoid from after delay
-        x_naught = self.delay_qtrs + self.scale_up_qtrs / 2
-        x_end = self.delay_qtrs + self.scale_up_qtrs
-        k = math.log(1/.95 - 1) / (x_naught - x_end)
-        return min((max_amt - start_amt) / (1 + math.exp(-k * (x - x_naught))), (max_amt - start_amt))
+        if self._sig_k is None:
+            # 1 / 2 scale_up_qtrs to place x_naught at vertical of sigmoid from after delay
+            x_naught = self.delay_qtrs + self.scale_up_qtrs / 2
+            x_end = self.delay_qtrs + self.scale_up_qtrs
+            self._sig_k = _SIGMOID_LOG / (x_naught - x_end)
+            self._sig_x0 = x_naught
+        return self._sig_k, self._sig_x0
+
+    def _sigmoid(self, x, max_amt, start_amt):
+        """logistic profile, see _sigmoid_constants for how k and x_naught are chosen"""
+        k, x_naught = self._sigmoid_constants()
+        return np.minimum((max_amt - start_amt) / (1 + np.exp(-k * (x - x_naught))), (max_amt - start_amt))
     
     def _linear(self, x, max_amt, start_amt):
         """y = mx + b. Units in amount (returned value) per quarter (x)"""
         m = (max_amt - start_amt) / self.scale_up_qtrs
         b = -m * self.delay_qtrs
-        return min(m * x + b, max_amt - start_amt) # Never return more than max
+        return np.minimum(m * x + b, max_amt - start_amt) # Never return more than max
     
     def _single(self, x, max_amt, start_amt):
-        if x == self.delay_qtrs:
-            return max_amt - start_amt
-        else:
-            return -1 * start_amt
+        return np.where(x == self.delay_qtrs, max_amt - start_amt, -1 * start_amt)
     
     def _step(self, x, max_amt, start_amt):
-        return max_amt - start_amt
-    
-    def _discounted(self, val, period_n):
-        return discount(val, self.discount_rate, period_n)
- 
-    def _calculate_qtr(self, f, discounted):
-        values = []
-        for quarter_n in self.periods_index:
-            if quarter_n < self.delay_qtrs:
-                values.append(0)
-            else:
-                multiplier = -1 if self.is_cost else 1
-                amt = f(quarter_n, self.max_amt, self.start_amt) + self.start_amt
-                amt = multiplier * amt
-                if discounted:
-                    amt = self._discounted(amt, quarter_n)
-
-                values.append(amt)
+        return np.full(x.shape, max_amt - start_amt, dtype=float)
+
+    # profile methods indexed by Profile value
+    _PROFILE_FUNCS = (_sigmoid, _linear, _step, _single)
+
+    def _evaluate(self, profile, max_amt, start_amt, is_cost, discounted):
+        """evaluates `profile` over every quarter, using the compiled kernel when numba is installed"""
+        if HAS_NUMBA:
+            return _compute_profile(
+                self.tot_qtrs, float(self.delay_qtrs), float(self.scale_up_qtrs or 0), float(max_amt),
+                float(start_amt), float(self.discount_rate), bool(is_cost), int(profile), bool(discounted)
+            )
+
+        x = np.arange(self.tot_qtrs)
+        f = self._PROFILE_FUNCS[profile]
+        # build one float buffer, then apply sign, discount and delay to it in place
+        values = np.add(f(self, x, max_amt, start_amt), start_amt, dtype=float)
+        return self._finish(values, is_cost, discounted)
+
+    def _evaluate_all(self, discounted):
+        """evaluates every profile into one (len(Profile), tot_qtrs) buffer, rows in Profile order"""
+        x = np.arange(self.tot_qtrs)
+        values = np.empty((len(self._PROFILE_FUNCS), self.tot_qtrs))
+        for row, f in zip(values, self._PROFILE_FUNCS):
+            row[:] = f(self, x, self.max_amt, self.start_amt)
+        values += self.start_amt
+        return self._finish(values, self.is_cost, discounted)
+
+    def _finish(self, values, is_cost, discounted):
+        """applies sign, discount and delay in place along the quarter (last) axis of `values`"""
+        values *= -1.0 if is_cost else 1.0
+        if discounted:
+            values *= self._memoized(('discount_factors',), discount_factors, self.discount_rate, self.tot_qtrs)
+
+        values[..., :max(0, math.ceil(self.delay_qtrs))] = 0.0  # nothing happens until the delay is over
         return values
 
-    def _calculate_dg_qtr(self, f, discounted):
+    def _calculate_qtr(self, profile, discounted):
+        """evaluates `profile` over every quarter at once, returns a read-only ndarray"""
+        return self._memoized(
+            ('qtr', profile, discounted),
+            self._evaluate, profile, self.max_amt, self.start_amt, self.is_cost, discounted
+        )
+
+    def _calculate_all_qtr(self, discounted):
+        """evaluates every profile at once, returns a read-only ndarray with one row per Profile"""
+        return self._memoized(('all_qtr', discounted), self._evaluate_all, discounted)
+
+    def _calculate_dg_qtr(self, profile, discounted):
         """calculates digital gallons per quarter"""
-        values = []
-        for quarter_n in self.periods_index:
-            if quarter_n < self.delay_qtrs:
-                values.append(0)
-            else:
-                start_gallons = 0
-                amt = f(quarter_n, self.digital_gallons, start_gallons)
-                if discounted:
-                    amt = self._discounted(amt, quarter_n)
-
-                values.append(amt)
-        return values
+        start_gallons = 0
+        return self._memoized(
+            ('dg_qtr', profile, discounted),
+            self._evaluate, profile, self.digital_gallons, start_gallons, False, discounted
+        )
 
     def _calculate_vc_qtr(self, discounted):
+        """variable cost per quarter, returns a read-only ndarray"""
+        return self._memoized(('vc_qtr', self.function, discounted), self._variable_cost, discounted)
+
+    def _variable_cost(self, discounted):
         """calculate the variable cost based on digital gallons
         """
         unit_multiplier = 10**6  # put in dollars
-        dg_to_variable_cost = lambda v: -1 * v * unit_multiplier * self.vc_per_dg
-        variable_cost = [0]  # No variable cost at Q0
-        cf_attribute = 'discounted_dg_qtr' if discounted else 'non_discounted_dg_qtr'
-        dg_cost = list(map(dg_to_variable_cost, getattr(self, cf_attribute)))
-
-        # iterable is of form [(0, (0, 1)), (1, (1, 2)), (n, (n + 1))]
-        for index, step in list(enumerate(zip(self.periods_index, self.periods)))[:-1]:
-            # integraing using trapezoidal riemann sum
-            step_vc = np.trapz([dg_cost[index], dg_cost[index + 1]], step)
-            variable_cost.append(step_vc)
+        # read the memoized ndarray directly rather than a list rebuilt by the dg_qtr properties
+        dg_cost = -unit_multiplier * self.vc_per_dg * self._calculate_dg_qtr(self.function, discounted)
 
-        return variable_cost
+        # integrating using trapezoidal riemann sum, each quarter covers [n - 1, n]
+        step_vc = 0.5 * (dg_cost[:-1] + dg_cost[1:]) * np.diff(self.periods)
+        return np.concatenate(([0.0], step_vc))  # No variable cost at Q0
 
     def quick_view(self, discounted=True):
+        # only plotting needs matplotlib, keep it off the import path of computation-only users
+        import matplotlib.pyplot as plt
+
+        # compute every profile in one pass before touching matplotlib
+        sigmoid, linear, step, single = self._calculate_all_qtr(discounted)
+
         fig = plt.figure()
         fig.patch.set_facecolor('#ffffff')
         ax = fig.add_subplot(1, 1, 1)
-        ax.plot(self.periods_labels, self.sigmoid_qtr(discounted=discounted), label='sigmoid')
-        ax.plot(self.periods_labels, self.linear_qtr(discounted=discounted), label='linear')
-        ax.plot(self.periods_labels, self.step_qtr(discounted=discounted), label='step')
-        ax.scatter(self.periods_labels, self.single_qtr(discounted=discounted), label='single')
+        ax.plot(self.periods_labels, sigmoid, label='sigmoid')
+        ax.plot(self.periods_labels, linear, label='linear')
+        ax.plot(self.periods_labels, step, label='step')
+        ax.scatter(self.periods_labels, single, label='single')
         # mark key axis positions for start value, delay, ramp, max value, etc
         ax.axvline(x=self.delay_qtrs, color='black', linestyle='--', linewidth=2)
         ax.axvline(x=self.scale_up_qtrs + self.delay_qtrs, color='black', linestyle='--', linewidth=2)
@@ -198,11 +469,11 @@ class CashFlow(CashFlowBase):
     
     def _qtr(self, discounted):
         """calculates quarter for instance based on set function type"""
-        return self._calculate_qtr(getattr(self, f'_{self.function.lower()}'), discounted)
+        return self._calculate_qtr(self.function, discounted).tolist()
 
     def _dg_qtr(self, discounted):
         """calculates quarter values for digital gallons"""
-        return self._calculate_dg_qtr(getattr(self, f'_{self.function.lower()}'), discounted)
+        return self._calculate_dg_qtr(self.function, discounted).tolist()
 
     @property
     def non_discounted_qtr(self):
@@ -223,43 +494,43 @@ class CashFlow(CashFlowBase):
 
     @property
     def non_discounted_vc_qtr(self):
-        return self._calculate_vc_qtr(False)
+        return self._calculate_vc_qtr(False).tolist()
 
     @property
     def discounted_vc_qtr(self):
-        return self._calculate_vc_qtr(True)
+        return self._calculate_vc_qtr(True).tolist()
 
     def sigmoid_qtr(self, discounted=True):
         """returns cash flow profile with a sigmoid profile, ignoring "function" attribute"""
-        return self._calculate_qtr(self._sigmoid, discounted)
+        return self._calculate_qtr(Profile.SIGMOID, discounted).tolist()
 
     def linear_qtr(self, discounted=True):
         """returns cash flow profile with a linear profile, ignoring "function" attribute"""
-        return self._calculate_qtr(self._linear, discounted)
+        return self._calculate_qtr(Profile.LINEAR, discounted).tolist()
     
     def step_qtr(self, discounted=True):
         """returns cash flow profile with a step profile, ignoring "function" attribute"""
-        return self._calculate_qtr(self._step, discounted)
+        return self._calculate_qtr(Profile.STEP, discounted).tolist()
     
     def single_qtr(self, discounted=True):
         """returns cash flow profile with a one-time amounts, ignoring "function" attribute"""
-        return self._calculate_qtr(self._single, discounted)
+        return self._calculate_qtr(Profile.SINGLE, discounted).tolist()
 
     def sigmoid_dg_qtr(self, discounted=True):
         """returns digital gallon profile with a sigmoid profile, ignoring "function" attribute"""
-        return self._calculate_dg_qtr(self._sigmoid, discounted)
+        return self._calculate_dg_qtr(Profile.SIGMOID, discounted).tolist()
 
     def linear_dg_qtr(self, discounted=True):
         """returns digital gallon profile with a linear profile, ignoring "function" attribute"""
-        return self._calculate_dg_qtr(self._linear, discounted)
+        return self._calculate_dg_qtr(Profile.LINEAR, discounted).tolist()
 
     def step_dg_qtr(self, discounted=True):
         """returns digital gallon profile with a step profile, ignoring "function" attribute"""
-        return self._calculate_dg_qtr(self._step, discounted)
+        return self._calculate_dg_qtr(Profile.STEP, discounted).tolist()
 
     def single_dg_qtr(self, discounted=True):
         """returns digital gallon profile with a one-time amounts, ignoring "function" attribute"""
-        return self._calculate_dg_qtr(self._single, discounted)
+        return self._calculate_dg_qtr(Profile.SINGLE, discounted).tolist()
     
     def to_json(self):
         return {
@@ -267,7 +538,7 @@ class CashFlow(CashFlowBase):
             "digital_gallons": self.digital_gallons,
             "discount_rate": self.discount_rate,
             "flow_id": str(self.id),
-            "function": self.function,
+            "function": self.function.name.lower(),
             "is_cost": self.is_cost,
             "name": self.name,
             "start_amt": self.start_amt,
@@ -278,9 +549,28 @@ class CashFlow(CashFlowBase):
 
 
 class FTECashFlow(CashFlowBase):
-    def __init__(self, discount_rate, fte_per_period, fte_period_cost, fte_y1, fte_y2, fte_y3, name, flow_id=uuid.uuid4()):
+    """FTE costs per period"""
+    __slots__ = (
+        '_cache', 'discount_rate', 'fte_per_period', 'fte_period_cost', 'fte_y1', 'fte_y2', 'fte_y3', 'id',
+        'is_cost', 'multiplier', 'name',
+    )
+
+    # attributes the quarter values are derived from, changing one invalidates the cache
+    _CACHE_ATTRS = frozenset(['discount_rate', 'fte_per_period', 'fte_period_cost', 'multiplier'])
+
+    _QTR_ARRAYS = {
+        'non_discounted_qtr': lambda cf: cf._cost_qtr(False),
+        'discounted_qtr': lambda cf: cf._cost_qtr(True),
+        'non_discounted_dg_qtr': lambda cf: cf._zeros(),
+        'discounted_dg_qtr': lambda cf: cf._zeros(),
+        'non_discounted_vc_qtr': lambda cf: cf._zeros(),
+        'discounted_vc_qtr': lambda cf: cf._zeros(),
+    }
+
+    def __init__(self, discount_rate, fte_per_period, fte_period_cost, fte_y1, fte_y2, fte_y3, name, flow_id=None):
+        self._cache = {}  # (kind, discounted) -> read-only ndarray, see _memoized
         self.name = name
-        self.id = flow_id
+        self.id = flow_id if flow_id is not None else uuid.uuid4()
         self.discount_rate = discount_rate
         self.fte_per_period = fte_per_period
         self.fte_period_cost = fte_period_cost
@@ -290,35 +580,47 @@ class FTECashFlow(CashFlowBase):
         self.is_cost = True
         self.multiplier = -1 if self.is_cost else 1
 
+    def __setattr__(self, name, value):
+        if name in self._CACHE_ATTRS:
+            self._cache.clear()
+        super().__setattr__(name, value)
+
+    def _fte_cost(self, discounted):
+        values = self.multiplier * self.fte_period_cost * np.asarray(self.fte_per_period, dtype=float)
+        if discounted:
+            values = values * discount_factors(self.discount_rate, len(values))
+        return values
+
+    def _cost_qtr(self, discounted):
+        return self._memoized(('qtr', discounted), self._fte_cost, discounted)
+
+    def _zeros(self):
+        # FTEs carry no digital gallons or variable cost
+        return self._memoized(('zeros', None), np.zeros, len(self.fte_per_period))
+
     @property
     def discounted_qtr(self):
-        return [
-            self.multiplier * discount(
-                self.fte_period_cost * period_fte,
-                self.discount_rate,
-                period
-            ) for period, period_fte in enumerate(self.fte_per_period)
-        ]
+        return self._cost_qtr(True).tolist()
 
     @property
     def non_discounted_qtr(self):
-        return [self.multiplier * self.fte_period_cost * period_fte for period_fte in self.fte_per_period]
+        return self._cost_qtr(False).tolist()
 
     @property
     def non_discounted_dg_qtr(self):
-        return [0 for _ in range(12)]
+        return self._zeros().tolist()
     
     @property
     def discounted_dg_qtr(self):
-        return [0 for _ in range(12)]
+        return self._zeros().tolist()
 
     @property
     def non_discounted_vc_qtr(self):
-        return [0 for _ in range(12)]
+        return self._zeros().tolist()
 
     @property
     def discounted_vc_qtr(self):
-        return [0 for _ in range(12)]
+        return self._zeros().tolist()
 
     def to_json(self):
         return {
@@ -331,10 +633,36 @@ class FTECashFlow(CashFlowBase):
         }
     
     
-def combine_flows(flows, attribute):
-    values = map(lambda cf: getattr(cf, attribute), flows)
-    aggregated_values = [sum(values) for values in zip(*values)]
-    return aggregated_values
+def combine_flows(flows, attribute, dtype=np.float64):
+    """sums `attribute` of every flow period by period, e.g. 'discounted_qtr'
+
+    `dtype` may be narrowed to np.float32 to halve memory traffic when aggregating very large
+    portfolios, at the cost of roughly 7 significant digits (cents are lost on $1M+ quarters).
+    """
+    if not flows:
+        return []
+    # one (flows x periods) block of the memoized arrays reduced in a single pass, instead of a python
+    # sum per period over list copies
+    return np.array([cf.qtr_array(attribute) for cf in flows], dtype=dtype).sum(axis=0).tolist()
+
+
+def profile_matrix(flows, discounted=True):
+    """(flows, tot_qtrs) ndarray of each CashFlow's own profile, evaluated in one compute_profile_batch call
+
+    Row i equals flows[i].discounted_qtr (or non_discounted_qtr), so `.sum(axis=0)` is the portfolio
+    timeline. All flows must share tot_qtrs.
+    """
+    if not flows:
+        return np.empty((0, 0))
+    tot_qtrs = {cf.tot_qtrs for cf in flows}
+    if len(tot_qtrs) != 1:
+        raise Exception(f'flows must share tot_qtrs to be evaluated together, got {sorted(tot_qtrs)}')
+    # struct of arrays: one column per parameter, one entry per flow
+    columns = zip(*(
+        (cf.delay_qtrs, cf.scale_up_qtrs or 0, cf.max_amt, cf.start_amt, cf.discount_rate, cf.is_cost, cf.function)
+        for cf in flows
+    ))
+    return compute_profile_batch(*columns, tot_qtrs.pop(), discounted)
 
 PORTFOLIO_NAME_COL_ID = '3338344949147524'
 PORTFOLIO_SCENARIO_COL_ID = '1429874066909060'
@@ -401,7 +729,8 @@ class PortfolioSheetRow(SmartsheetRow):
     def is_required(self, cells_dict, cell_descriptor):
         """Custom logic to determine if cells are filled out correctly in SmartSheet"""
         # ensure at least function column is populated, we require it for logic
-        assert cells_dict[PORTFOLIO_FUNC_COL_ID].get('value', False)
+        if not cells_dict.get(PORTFOLIO_FUNC_COL_ID, {}).get('value', False):
+            raise Exception(f'Failed to process Row <{self.row_number}>. Missing function')
         always_required = [
             'name',
             'include_in_model',
@@ -417,7 +746,7 @@ class PortfolioSheetRow(SmartsheetRow):
 
         function = self._function(cells_dict[PORTFOLIO_FUNC_COL_ID]['value'])
         if cell_descriptor.name in always_required or \
-                cell_descriptor.name == 'scale_up_qtrs' and function != 'step':
+                cell_descriptor.name == 'scale_up_qtrs' and function != Profile.STEP:
             return True
 
         return False
@@ -426,22 +755,25 @@ class PortfolioSheetRow(SmartsheetRow):
         """By convention, discount rates are expressed in annualized terms. Convert to period"""
         return val / self.periods_in_year
         
-    @staticmethod
-    def _function(val):
+    # SmartSheet profile names, lower cased, to the profile CashFlow models them with
+    _PROFILE_MAP = {
+        'continuous': Profile.STEP,
+        'step': Profile.STEP,
+        'single pmt.': Profile.SINGLE,
+        'logistic': Profile.SIGMOID,
+        'linear': Profile.LINEAR,
+    }
+    _MULTI_STEP = 'multi-step (yr)'
+
+    @classmethod
+    def _function(cls, val):
         text = val.strip().lower()
-        # TODO: replace returns with FUNCTION.SIGMOID type class attributes
-        if text == 'continuous' or text == 'step':
-            return 'step'
-        elif text == 'single pmt.':
-            return 'single'
-        elif text == 'logistic':
-            return 'sigmoid'
-        elif text == 'linear':
-            return 'linear'
-        elif text == 'multi-step (yr)':
-            raise Exception('Should be using PortfolioFTEParser, there is a bug in code')
-        else:
-            raise Exception(f'Unknown profile type: {val}')
+        try:
+            return cls._PROFILE_MAP[text]
+        except KeyError:
+            if text == cls._MULTI_STEP:
+                raise Exception('Should be using PortfolioFTEParser, there is a bug in code') from None
+            raise Exception(f'Unknown profile type: {val}') from None
     
     @staticmethod
     def _include_in_model(val):
@@ -457,6 +789,11 @@ class PortfolioSheetRow(SmartsheetRow):
     def _start_value(self, val):
         return (val * self.amt_unit_conversion) / 4
 
+    def to_json(self):
+        json = super().to_json()
+        json['function'] = self.function.name.lower()  # the profile name, as in CashFlow.to_json
+        return json
+
 
 class PortfolioFTEParser(SmartsheetRow):
     CELL_00 = Cell(PORTFOLIO_NAME_COL_ID, 'name')
@@ -470,9 +807,9 @@ class PortfolioFTEParser(SmartsheetRow):
         self.amt_unit_conversion = 10**6 # covert from millions to dollars
         self.periods_in_year = periods_in_year
         super().__init__(row)
-        self.fte_per_period = [self.fte_y1 for _ in range(self.periods_in_year)] + \
-                          [self.fte_y2 for _ in range(self.periods_in_year)] + \
-                          [self.fte_y3 for _ in range(self.periods_in_year)]
+        self.fte_per_period = np.repeat(
+            np.array([self.fte_y1, self.fte_y2, self.fte_y3], dtype=np.float64), self.periods_in_year
+        )
         
     def is_required(self, cells_dict, cell_descriptor):
         always_required = ['name', 'fte_y1', 'fte_y2', 'fte_y3', 'project_code', 'discount_rate']
@@ -496,11 +833,13 @@ class PortfolioFTEParser(SmartsheetRow):
 
 
 def scan_global_vars(sheet, name, start_row, end_row):
+    col_index = build_col_index(sheet)  # columns sit at the same position in every row
     for sheet_row in sheet.rows[start_row:end_row]:
-        cell_name = get_smartsheet_col_by_id(sheet_row, PORTFOLIO_NAME_COL_ID).get('value', None)
+        cell_name = get_smartsheet_col_by_id(sheet_row, PORTFOLIO_NAME_COL_ID, col_index).get('value', None)
         cell_value = get_smartsheet_col_by_id(
             sheet_row,
-            PORTFOLIO_GLOB_VAR_VALUE_COL_ID
+            PORTFOLIO_GLOB_VAR_VALUE_COL_ID,
+            col_index
         ).get('value', None)
         if cell_name is not None and name.lower() == cell_name.lower():
             return cell_value
@@ -1,9 +1,23 @@
+import copy
 import unittest
 import uuid
 
 from collections import namedtuple
 
-from portfolio import CashFlow
+import numpy as np
+
+from portfolio import (
+    PORTFOLIO_COMMENTS_COL_ID, PORTFOLIO_DELAY_PERIOD_COL_ID, PORTFOLIO_DG_COL_ID, PORTFOLIO_DR_COL_ID,
+    PORTFOLIO_FTE_Y1_COL_ID, PORTFOLIO_FTE_Y2_COL_ID, PORTFOLIO_FTE_Y3_COL_ID, PORTFOLIO_FUNC_COL_ID,
+    PORTFOLIO_INCLUDE_COL_ID, PORTFOLIO_IS_COST_COL_ID, PORTFOLIO_MAX_AMT_COL_ID, PORTFOLIO_NAME_COL_ID,
+    PORTFOLIO_PROJ_CODE_COL_ID, PORTFOLIO_SCALE_PERIOD_COL_ID, PORTFOLIO_START_AMT_COL_ID, CashFlow,
+    FTECashFlow, PortfolioFTEParser, PortfolioSheetRow, Profile, _compute_profile, _compute_profile_block,
+    combine_flows, compute_profile_batch, discount, profile_matrix
+)
+from utils import (
+    build_col_index, colorscale, colorscale_many, get_smartsheet_cell, get_smartsheet_col_by_id,
+    human_currency_format, scan_rows_for_start_stop
+)
 
 
 Point = namedtuple('Point', ['x', 'y'])
@@ -17,7 +31,7 @@ class TestCashFlow(unittest.TestCase):
         self.cf = CashFlow(
             delay_qtrs=self.delay_qtrs, digital_gallons=5, discount_rate=.1, function='sigmoid',
             is_cost=False, start_amt=self.start_amt, max_amt=self.max_amt, scale_up_qtrs=self.scale_up_qtrs,
-            tot_qtrs=8, name='test'
+            tot_qtrs=8, name='test', vc_per_dg=.5
         )
         self.update_points()
 
@@ -40,6 +54,15 @@ class TestCashFlow(unittest.TestCase):
     def test_can_create_instance(self):
         self.assertIsInstance(self.cf, CashFlow)
     
+    def test_instances_get_unique_ids(self):
+        other = CashFlow(
+            delay_qtrs=self.delay_qtrs, digital_gallons=5, discount_rate=.1, function='linear',
+            is_cost=False, max_amt=self.max_amt, scale_up_qtrs=self.scale_up_qtrs, vc_per_dg=.5
+        )
+        self.assertNotEqual(self.cf.id, other.id)
+        fte_flows = [FTECashFlow(.025, [1] * 12, 1, 1, 1, 1, name) for name in ('a', 'b')]
+        self.assertNotEqual(fte_flows[0].id, fte_flows[1].id)
+
     def test_key_points_linear(self):
         qtr = self.cf.linear_qtr(discounted=False)
         self.assertEqual(qtr[self.start_scale_point.x], self.start_scale_point.y)
@@ -68,5 +91,324 @@ class TestCashFlow(unittest.TestCase):
         self.assertEqual(qtr[self.mid_scale_point.x], self.mid_scale_point.y)
         self.assertAlmostEqual(qtr[self.end_scale_point.x], end_y)
 
+    def test_key_points_sigmoid_after_delay_change(self):
+        self.cf.sigmoid_qtr(discounted=False)
+        self.set_prop('delay_qtrs', 3)
+        qtr = self.cf.sigmoid_qtr(discounted=False)
+        self.assertEqual(qtr[self.delay_qtrs - 1], 0)
+        self.assertEqual(qtr[self.mid_scale_point.x], self.mid_scale_point.y)
+
+    def test_tot_qtrs_change_resizes_periods(self):
+        self.cf.discounted_vc_qtr
+        self.set_prop('tot_qtrs', 16)
+        self.assertEqual(len(self.cf.periods_labels), 16)
+        self.assertEqual(len(self.cf.discounted_qtr), 16)
+        self.assertEqual(len(self.cf.discounted_vc_qtr), 16)
+        self.assertEqual(len(self.cf.non_discounted_vc_qtr), 16)
+
+    def test_copy_has_own_cache(self):
+        original = self.cf.discounted_qtr
+        other = copy.copy(self.cf)
+        other.max_amt = 10
+        self.assertEqual(self.cf.discounted_qtr, original)
+        self.assertNotEqual(other.discounted_qtr, original)
+        fte = FTECashFlow(0, [1] * 4, 2, 1, 1, 1, 'fte')
+        fte.discounted_qtr
+        other_fte = copy.copy(fte)
+        other_fte.fte_period_cost = 3
+        self.assertEqual(fte.discounted_qtr, [-2.0] * 4)
+        self.assertEqual(other_fte.discounted_qtr, [-3.0] * 4)
+
+    def test_vc_matches_pairwise_trapezoid(self):
+        for function in ('sigmoid', 'step'):
+            self.cf.function = function
+            for discounted, vc in ((False, self.cf.non_discounted_vc_qtr), (True, self.cf.discounted_vc_qtr)):
+                dg = np.asarray(self.cf.discounted_dg_qtr if discounted else self.cf.non_discounted_dg_qtr)
+                dg_cost = -10**6 * self.cf.vc_per_dg * dg
+                periods = self.cf.periods
+                # trapezoid over each pair of adjacent quarters, written out since np.trapezoid needs numpy 2
+                expected = [0.0] + [
+                    0.5 * (dg_cost[i] + dg_cost[i + 1]) * (periods[i + 1] - periods[i])
+                    for i in range(self.cf.tot_qtrs - 1)
+                ]
+                np.testing.assert_allclose(vc, expected, err_msg=function)
+
+    def test_fte_flow_recomputes_on_change(self):
+        fte = FTECashFlow(0, [1] * 4, 2, 1, 1, 1, 'fte')
+        self.assertEqual(fte.discounted_qtr, [-2.0] * 4)
+        fte.fte_period_cost = 3
+        self.assertEqual(fte.non_discounted_qtr, [-3.0] * 4)
+        fte.discount_rate = .1
+        np.testing.assert_allclose(fte.discounted_qtr, -3 / 1.1 ** np.arange(4))
+        fte.fte_per_period = [1] * 8
+        self.assertEqual(fte.non_discounted_qtr, [-3.0] * 8)
+        self.assertEqual(fte.discounted_vc_qtr, [0.0] * 8)
+
+    def test_combine_flows_uses_qtr_arrays(self):
+        fte = FTECashFlow(.025, [1] * 8, 2, 1, 1, 1, 'fte')
+        for attribute in ('discounted_qtr', 'non_discounted_qtr', 'discounted_vc_qtr', 'non_discounted_dg_qtr'):
+            for flow in (self.cf, fte):
+                self.assertEqual(flow.qtr_array(attribute).tolist(), getattr(flow, attribute))
+            expected = np.add(getattr(self.cf, attribute), getattr(fte, attribute))
+            np.testing.assert_allclose(combine_flows([self.cf, fte], attribute), expected)
+        self.assertEqual(combine_flows([], 'discounted_qtr'), [])
+
+    def test_profile_parse(self):
+        self.assertIs(Profile.parse(' Linear '), Profile.LINEAR)
+        self.assertIs(Profile.parse(Profile.STEP), Profile.STEP)
+        for value in ('bogus', None, 1):
+            with self.assertRaisesRegex(Exception, 'Unknown profile type'):
+                Profile.parse(value)
+
+    def test_kernel_matches_numpy_profiles(self):
+        x = np.arange(self.cf.tot_qtrs)
+        for profile in Profile:
+            for discounted in (False, True):
+                f = CashFlow._PROFILE_FUNCS[profile]
+                expected = f(self.cf, x, self.max_amt, self.start_amt) + self.start_amt
+                if discounted:
+                    expected = expected / (1 + self.cf.discount_rate) ** x
+                expected = np.where(x < self.delay_qtrs, 0.0, expected)
+                actual = _compute_profile(
+                    self.cf.tot_qtrs, float(self.delay_qtrs), float(self.scale_up_qtrs), float(self.max_amt),
+                    float(self.start_amt), self.cf.discount_rate, False, int(profile), discounted
+                )
+                np.testing.assert_allclose(actual, expected, err_msg=profile.name)
+
+    def test_linear_kernel_is_zero_at_delay(self):
+        for delay in range(7):
+            for scale in (3., 7., 9.):
+                for max_amt in (.7, 13.3, 41.9):
+                    values = _compute_profile(12, float(delay), scale, max_amt, 0., .025, True, 1, True)
+                    self.assertEqual(values[delay], 0, (delay, scale, max_amt))
+
+    def test_profile_batch_matches_instances(self):
+        other = CashFlow(
+            delay_qtrs=1, digital_gallons=5, discount_rate=.1, function='linear', is_cost=True,
+            start_amt=0, max_amt=3, scale_up_qtrs=2, tot_qtrs=8, vc_per_dg=.5
+        )
+        flows = [self.cf, other]
+        for discounted in (False, True):
+            batch = compute_profile_batch(
+                [cf.delay_qtrs for cf in flows], [cf.scale_up_qtrs for cf in flows],
+                [cf.max_amt for cf in flows], [cf.start_amt for cf in flows],
+                [cf.discount_rate for cf in flows], [cf.is_cost for cf in flows],
+                [cf.function for cf in flows], 8, discounted
+            )
+            for row, cf in zip(batch, flows):
+                np.testing.assert_allclose(row, cf._calculate_qtr(cf.function, discounted), atol=1e-12)
+
+    def test_profile_block_matches_kernel(self):
+        params = [
+            np.array([0., 2.5, 3., 1., 2.]), np.array([4., 3., 0., 2., 9.]), np.array([5., 3., 2., 7., 1.]),
+            np.array([1., 0., .5, 0., 2.]), np.array([.025, 0., .1, .025, .025]),
+            np.array([False, True, True, False, True]), np.array([0, 1, 2, 3, 0], dtype=np.int64),
+        ]
+        for discounted in (False, True):
+            expected = [_compute_profile(8, *flow_params, discounted) for flow_params in zip(*params)]
+            np.testing.assert_allclose(_compute_profile_block(8, *params, discounted), expected, atol=1e-12)
+
+    def test_profile_matrix_matches_properties(self):
+        other = CashFlow(
+            delay_qtrs=0, digital_gallons=5, discount_rate=.1, function='step', is_cost=True,
+            start_amt=0, max_amt=3, scale_up_qtrs=None, tot_qtrs=8, vc_per_dg=.5
+        )
+        matrix = profile_matrix([self.cf, other])
+        np.testing.assert_allclose(matrix[0], self.cf.discounted_qtr, atol=1e-12)
+        np.testing.assert_allclose(matrix[1], other.discounted_qtr, atol=1e-12)
+        np.testing.assert_allclose(profile_matrix([other], discounted=False)[0], other.non_discounted_qtr)
+
+    def test_all_profiles_match_single_profiles(self):
+        for discounted in (False, True):
+            batch = self.cf._calculate_all_qtr(discounted)
+            for profile in Profile:
+                np.testing.assert_allclose(
+                    batch[profile], self.cf._calculate_qtr(profile, discounted), atol=1e-12, err_msg=profile.name
+                )
+
+    def test_discount_broadcasts(self):
+        self.assertAlmostEqual(discount(121, .1, 2), 100)
+        np.testing.assert_allclose(discount(np.full(3, 100.), .1, np.arange(3)), [100, 100 / 1.1, 100 / 1.21])
+
+
+def make_row(values, row_number=7):
+    """row dict as the smartsheet api sends it: int column ids, no 'value' key for empty cells"""
+    cells = []
+    for col_id, value in values.items():
+        cell = {'columnId': int(col_id)}
+        if value is not None:
+            cell['value'] = value
+        cells.append(cell)
+    return {'rowNumber': row_number, 'cells': cells}
+
+
+class TestPortfolioRows(unittest.TestCase):
+    def setUp(self):
+        self.values = {
+            PORTFOLIO_NAME_COL_ID: 'test',
+            PORTFOLIO_INCLUDE_COL_ID: 'Yes',
+            PORTFOLIO_PROJ_CODE_COL_ID: 'P1',
+            PORTFOLIO_IS_COST_COL_ID: 'Cost',
+            PORTFOLIO_FUNC_COL_ID: 'Logistic',
+            PORTFOLIO_DR_COL_ID: .1,
+            PORTFOLIO_START_AMT_COL_ID: 0.0,
+            PORTFOLIO_DELAY_PERIOD_COL_ID: 2,
+            PORTFOLIO_MAX_AMT_COL_ID: 5.0,
+            PORTFOLIO_SCALE_PERIOD_COL_ID: 4,
+            PORTFOLIO_DG_COL_ID: 10,
+            PORTFOLIO_COMMENTS_COL_ID: 'note',
+        }
+
+    def test_complete_row(self):
+        row = PortfolioSheetRow(make_row(self.values))
+        self.assertEqual(row.name, 'test')
+        self.assertIs(row.function, Profile.SIGMOID)
+        self.assertAlmostEqual(row.discount_rate, .025)
+        self.assertEqual(row.max_amt, 1250000.0)
+        self.assertEqual(row.start_value, 0.0)
+        self.assertIs(row.include_in_model, True)
+        self.assertIs(row.is_cost, True)
+        self.assertEqual(row.comments, 'note')
+        self.assertEqual(row.to_json()['function'], 'sigmoid')
+
+    def test_absent_optional_column_is_none(self):
+        del self.values[PORTFOLIO_COMMENTS_COL_ID]
+        self.values[PORTFOLIO_SCALE_PERIOD_COL_ID] = None
+        self.values[PORTFOLIO_FUNC_COL_ID] = 'Step'
+        row = PortfolioSheetRow(make_row(self.values))
+        self.assertIsNone(row.comments)
+        self.assertIsNone(row.scale_up_qtrs)
+        self.assertIsNone(row.annual_revenue)
+
+    def test_missing_required_value_raises(self):
+        self.values[PORTFOLIO_NAME_COL_ID] = None
+        with self.assertRaisesRegex(Exception, r'Failed to process Row <7>\. Missing name'):
+            PortfolioSheetRow(make_row(self.values))
+        self.values[PORTFOLIO_NAME_COL_ID] = 'test'
+        self.values[PORTFOLIO_SCALE_PERIOD_COL_ID] = None
+        with self.assertRaisesRegex(Exception, 'Missing scale_up_qtrs'):
+            PortfolioSheetRow(make_row(self.values))
+
+    def test_bad_function_raises(self):
+        self.values[PORTFOLIO_FUNC_COL_ID] = 'Multi-step (yr)'
+        with self.assertRaisesRegex(Exception, 'Should be using PortfolioFTEParser'):
+            PortfolioSheetRow(make_row(self.values))
+        self.values[PORTFOLIO_FUNC_COL_ID] = 'bogus'
+        with self.assertRaisesRegex(Exception, 'Unknown profile type: bogus'):
+            PortfolioSheetRow(make_row(self.values))
+        del self.values[PORTFOLIO_FUNC_COL_ID]
+        with self.assertRaisesRegex(Exception, r'Failed to process Row <7>\. Missing function'):
+            PortfolioSheetRow(make_row(self.values))
+
+    def test_fte_row(self):
+        values = {
+            PORTFOLIO_NAME_COL_ID: 'fte', PORTFOLIO_FTE_Y1_COL_ID: 1.0, PORTFOLIO_FTE_Y2_COL_ID: 2.0,
+            PORTFOLIO_FTE_Y3_COL_ID: 3.0, PORTFOLIO_PROJ_CODE_COL_ID: 'P2', PORTFOLIO_DR_COL_ID: .1,
+            PORTFOLIO_COMMENTS_COL_ID: 'ignored',
+        }
+        row = PortfolioFTEParser(make_row(values))
+        self.assertEqual(row.fte_y1, 1e6)
+        self.assertAlmostEqual(row.discount_rate, .025)
+        np.testing.assert_array_equal(row.fte_per_period, np.repeat([1e6, 2e6, 3e6], 4))
+        values[PORTFOLIO_FTE_Y2_COL_ID] = None
+        with self.assertRaisesRegex(Exception, 'Missing fte_y2'):
+            PortfolioFTEParser(make_row(values))
+
+
+# minimal stand-ins for the smartsheet Sheet/Row/Cell objects, the sdk isn't needed to run the tests
+StubColumn = namedtuple('StubColumn', ['id', 'index'])
+
+
+class StubCell:
+    def __init__(self, column_id, value=None):
+        self.column_id = column_id
+        self.value = value
+
+    def to_dict(self):
+        cell = {'columnId': self.column_id}
+        if self.value is not None:
+            cell['value'] = self.value
+        return cell
+
+
+class StubRow:
+    def __init__(self, row_number, cells):
+        self.row_number = row_number
+        self.cells = cells
+        self.serialized = 0
+
+    def to_dict(self):
+        self.serialized += 1
+        return {'rowNumber': self.row_number, 'cells': [cell.to_dict() for cell in self.cells]}
+
+
+class StubSheet:
+    def __init__(self, first_col_values, column_ids=(11, 22)):
+        self.columns = [StubColumn(col_id, i) for i, col_id in enumerate(column_ids)]
+        self.rows = [
+            StubRow(i + 1, [StubCell(column_ids[0], value)] + [StubCell(col_id, i) for col_id in column_ids[1:]])
+            for i, value in enumerate(first_col_values)
+        ]
+
+
+class TestSheetHelpers(unittest.TestCase):
+    def test_scan_rows_matches_start_and_end(self):
+        sheet = StubSheet(['Title', ' START Global Vars ', 'a', 'b', 'end global vars', None])
+        self.assertEqual(scan_rows_for_start_stop(sheet, 'Global Vars', as_index=True), (2, 4))
+        self.assertEqual(scan_rows_for_start_stop(sheet, 'Global Vars', as_index=False), (3, 5))
+        # reads row.cells[0].value directly, no row is serialized
+        self.assertFalse(any(row.serialized for row in sheet.rows))
+
+    def test_scan_rows_needs_exact_match(self):
+        sheet = StubSheet(['Start Global Vars Old', 'a', 'End Global Vars Old'])
+        with self.assertRaisesRegex(Exception, 'could not find rows'):
+            scan_rows_for_start_stop(sheet, 'Global Vars')
+
+    def test_scan_rows_ignores_end_before_start(self):
+        sheet = StubSheet(['End Global Vars', 'Start Global Vars', 'a', 'End Global Vars'])
+        self.assertEqual(scan_rows_for_start_stop(sheet, 'Global Vars'), (2, 3))
+
+    def test_col_by_id_positional(self):
+        sheet = StubSheet(['a', 'b'])
+        col_index = build_col_index(sheet)
+        row = sheet.rows[1]
+        self.assertEqual(get_smartsheet_col_by_id(row, '22', col_index), {'columnId': 22, 'value': 1})
+        self.assertEqual(row.serialized, 0)
+        self.assertEqual(get_smartsheet_col_by_id(row, '11'), {'columnId': 11, 'value': 'b'})
+        with self.assertRaisesRegex(Exception, 'column with ID <33> does not exist'):
+            get_smartsheet_col_by_id(row, '33', col_index)
+
+    def test_col_by_id_falls_back_on_mismatch(self):
+        sheet = StubSheet(['a'])
+        col_index = build_col_index(sheet)
+        # a row fetched with only some columns, cells no longer sit at the sheet's column positions
+        row = StubRow(1, [StubCell(22, 'only')])
+        self.assertEqual(get_smartsheet_col_by_id(row, '22', col_index), {'columnId': 22, 'value': 'only'})
+        self.assertEqual(row.serialized, 1)
+
+    def test_smartsheet_cell(self):
+        sheet = StubSheet(['a', None])
+        self.assertEqual(get_smartsheet_cell(1, 1, sheet), {'columnId': 11, 'value': 'a'})
+        self.assertEqual(get_smartsheet_cell(1, 2, sheet, 'value'), 0)
+        self.assertIsNone(get_smartsheet_cell(9, 1, sheet))
+        with self.assertRaisesRegex(Exception, '<value> does not exist in row'):
+            get_smartsheet_cell(2, 1, sheet, 'value')
+
+
+class TestColorscale(unittest.TestCase):
+    def test_many_matches_single(self):
+        palette = ['#9e008c', '#C5DA00', '#A0C8F0', '#9BA08C', 'black']
+        for scalefactor in (0, .5, 1, 1.6, 3, -1):
+            self.assertEqual(
+                colorscale_many(palette, scalefactor), [colorscale(color, scalefactor) for color in palette]
+            )
+
+
+class TestCurrencyFormat(unittest.TestCase):
+    def test_suffixes(self):
+        nums = [0, 7, -999, 999.5, 1234.5, -2e6, 0.000123, 987654321, 3e15]
+        expected = ['0', '7', '-999', '1k', '1.23k', '-2m', '0.000123', '988m', '3000t']
+        self.assertEqual([human_currency_format(num) for num in nums], expected)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,8 @@
+import math
 from collections import namedtuple
 
+import numpy as np
+
 
 # Simple named tuple to organize the index of a cell, and if it is required or not
 #
@@ -15,52 +18,96 @@ class SmartsheetRow():
     class attributes with a namedtuple defining each cell that should be parsed. This child class will
     inherit from this one, and automatically load and process all defined attributes.
     It is also possible to define methods to override the value when necessary. For example, divide an
-    annual value by four
+    annual value by four.
+    `cells_dct` maps Cell.col_id to the cell dict, for the columns declared by `CELL_*` attributes only;
+    other columns of the row are not kept.
     """
+    _cell_defs = ()
+    _cell_plan = ()
+    _col_ids = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # cell definitions are class attributes, so collect them once per class instead of per row
+        cls._cell_defs = tuple(getattr(cls, attr) for attr in dir(cls) if attr.startswith('CELL_'))
+        # two definitions writing the same attribute would silently drop one of the cells
+        names = [cell_def.name for cell_def in cls._cell_defs]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise Exception(f'{cls.__name__} defines more than one cell for {duplicates}')
+        # pair each cell with the name of its `_<name>` modifier (or None), so rows skip the failing
+        # getattr for cells without one
+        cls._cell_plan = tuple(
+            (cell_def, f'_{cell_def.name}' if getattr(cls, f'_{cell_def.name}', None) is not None else None)
+            for cell_def in cls._cell_defs
+        )
+        # the only columns rows of this class ever read, other cells are not indexed. Keyed by the
+        # columnId smartsheet sends (an int) as well as the Cell.col_id string, so rows skip str() per cell
+        col_ids = {}
+        for cell_def in cls._cell_defs:
+            col_ids[cell_def.col_id] = cell_def.col_id
+            if str(cell_def.col_id).isdigit():
+                col_ids[int(cell_def.col_id)] = cell_def.col_id
+        cls._col_ids = col_ids
+
     def __init__(self, row_dict):
         self.row_dict = row_dict
-        self.cells_dct = { str(cell['columnId']): cell for cell in row_dict['cells'] }
+        self.cells_dct = {}
+        for cell in row_dict['cells']:
+            col_id = self._col_ids.get(cell['columnId'])
+            if col_id is not None:
+                self.cells_dct[col_id] = cell
         self.row_number = row_dict['rowNumber']
-        # essentially grab the class attributes
-        self.cell_defs = [getattr(self, attr) for attr in dir(self) if 'CELL_' in attr]
+        self.cell_defs = self._cell_defs
         self._load_cells()
 
     def _load_cells(self):
-        for cell_def in self.cell_defs:
-            modifier = getattr(self, f'_{cell_def.name}', None) or self._identity
-            unmodified = self._get_cell(cell_def)
-            value = modifier(unmodified) if unmodified is not None else None
+        for cell_def, modifier in self._cell_plan:
+            value = self._get_cell(cell_def)
+            if value is not None and modifier is not None:
+                value = getattr(self, modifier)(value)
             setattr(self, cell_def.name, value)
-    
-    @staticmethod
-    def _identity(x):
-        return x
 
     def is_required(self, cells_dict, cell_descriptor):
-        """Returns if cell is required or not. Defaults to all not required if not overriden"""
+        """Returns if cell is required or not. Defaults to all not required if not overriden
+
+        `cells_dict` holds only the columns declared by the class's `CELL_*` attributes, keyed by Cell.col_id,
+        so any other column an override looks at must be declared as a cell too
+        """
         return False
         
     def _get_cell(self, cell_descriptor):
-        """Will try to grab the cell regardless, if it is required, an error will be logged"""
-        try:
-            if self.is_required(self.cells_dct, cell_descriptor):
-                return self.cells_dct[cell_descriptor.col_id]['value']
-            else:
-                return self.cells_dct[cell_descriptor.col_id].get('value', None)
-        except:
+        """Returns the cell value, or None if the cell or its value is absent. Raises if a required one is"""
+        cell = self.cells_dct.get(cell_descriptor.col_id)
+        if cell is not None and 'value' in cell:
+            return cell['value']
+        # only absent cells need the (possibly costly) required check
+        if self.is_required(self.cells_dct, cell_descriptor):
             raise Exception(f'Failed to process Row <{self.row_number}>. Missing {cell_descriptor.name}')
+        return None
 
     def to_json(self):
-        cell_defs = [getattr(self, attr) for attr in dir(self) if 'CELL_' in attr]
-        return { cd.name: getattr(self, cd.name) for cd in cell_defs }
+        return { cd.name: getattr(self, cd.name) for cd in self._cell_defs }
 
 
-def get_smartsheet_col_by_id(sheet_row, col_id):
-    row_dct = { str(cell['columnId']): cell for cell in sheet_row.to_dict()['cells'] }
-    try:
-        return row_dct[col_id]
-    except KeyError:
-        raise Exception(f'column with ID <{col_id}> does not exist in provided smartsheet row')
+def build_col_index(sheet):
+    """Maps each column ID (as a string) to its position in the sheet's rows, see `get_smartsheet_col_by_id`"""
+    return { str(column.id): column.index for column in sheet.columns }
+
+
+def get_smartsheet_col_by_id(sheet_row, col_id, col_index=None):
+    """Returns the cell dict of `col_id`. Pass `col_index` from `build_col_index` to read the cell by its
+    position instead of serializing the whole row"""
+    position = col_index.get(col_id) if col_index is not None else None
+    if position is not None and position < len(sheet_row.cells):
+        cell = sheet_row.cells[position]
+        if str(cell.column_id) == col_id:
+            return cell.to_dict()
+    # rows fetched with only some columns are not positional, fall back to searching every cell
+    for cell in sheet_row.to_dict()['cells']:
+        if str(cell['columnId']) == col_id:
+            return cell
+    raise Exception(f'column with ID <{col_id}> does not exist in provided smartsheet row')
 
 
 def get_smartsheet_cell(row, col, sheet, attribute=None):
@@ -74,14 +121,16 @@ def get_smartsheet_cell(row, col, sheet, attribute=None):
             data. If provided, returns attribute.
     """
     try:
-        row = sheet.rows[row - 1 ] # -1 for 0 based indexing
-        cells = row.to_dict()['cells']
-        cell_value = cells[col - 1] # -1 for 0 based indexing
-        return cell_value if attribute is None else cell_value[attribute]
+        # -1s for 0 based indexing, only the requested cell is serialized rather than the whole row
+        cell_value = sheet.rows[row - 1].cells[col - 1].to_dict()
     except IndexError:
         return None
-    except AttributeError:
-        raise Exception(f'<{attribute}> does not exist in row')
+    if attribute is None:
+        return cell_value
+    try:
+        return cell_value[attribute]
+    except KeyError:
+        raise Exception(f'<{attribute}> does not exist in row') from None
 
 
 def scan_rows_for_start_stop(sheet, string, as_index=True):
@@ -89,23 +138,30 @@ def scan_rows_for_start_stop(sheet, string, as_index=True):
     
     Args:
         sheet (smartsheet object)
-        string (str): The string (excluding start/stop) which function will scan the rows for
+        string (str): The string (excluding start/end) which function will scan the rows for, matched
+            case-insensitively against first cells reading "Start <string>" and "End <string>"
         as_index (boolean): if the returned starting values should be the actual row numbers or their index
     """
     offset = 0 if as_index else 1
     start = None
+    start_key = f'start {string.lower()}'
+    end_key = f'end {string.lower()}'
     for row_index, row in enumerate(sheet.rows):
-        cell_value = row.to_dict()['cells'][0].get('value', '').strip().lower()
-        col_string = ' '.join(cell_value.split(' ')[1:])
-        if col_string == string.lower():
-            if start is None:
+        # read the first cell straight off the Row object, to_dict() would serialize every cell of the row
+        cell_value = (row.cells[0].value or '').strip().lower()
+        if start is None:
+            if cell_value == start_key:
                 start = row_index + 1 # +1 to not include the "start" row
-                continue
+        elif cell_value == end_key:
             end = row_index
             return start + offset, end + offset
     raise Exception(f'could not find rows that started and ended with <{string}>')
 
 
+# two digit lower case hex for every channel value, indexed instead of parsing a format string per call
+_HEX256 = tuple(f'{i:02x}' for i in range(256))
+
+
 def _clamp(val, minimum=0, maximum=255):
     if val < minimum:
         return int(minimum)
@@ -133,6 +189,8 @@ def colorscale(hexstr, scalefactor):
 
     if scalefactor < 0 or len(hexstr) != 6:
         return hexstr
+    if scalefactor == 1:
+        return '#' + hexstr.lower()  # unchanged, but normalized like the scaled output
 
     r, g, b = int(hexstr[:2], 16), int(hexstr[2:4], 16), int(hexstr[4:], 16)
 
@@ -140,15 +198,40 @@ def colorscale(hexstr, scalefactor):
     g = _clamp(g * scalefactor)
     b = _clamp(b * scalefactor)
 
-    return "#%02x%02x%02x" % (r, g, b)
+    return '#' + _HEX256[r] + _HEX256[g] + _HEX256[b]
+
+
+def colorscale_many(hexstrs, scalefactor):
+    """
+    Scales a palette of hex strings by ``scalefactor`` in one numpy pass, see ``colorscale``.
+    Returns a list of scaled hex strings.
+
+    >>> colorscale_many(["#DF3C3C", "#52D24F"], .5)
+    ['#6f1e1e', '#296927']
+    """
+    hexstrs = [hexstr.strip('#') for hexstr in hexstrs]
+    if scalefactor < 0 or any(len(hexstr) != 6 for hexstr in hexstrs):
+        # names such as 'black' and negative factors pass through, exactly as colorscale handles them
+        return [colorscale(hexstr, scalefactor) for hexstr in hexstrs]
+    if scalefactor == 1:
+        return ['#' + hexstr.lower() for hexstr in hexstrs]
+
+    rgb = np.frombuffer(bytes.fromhex(''.join(hexstrs)), dtype=np.uint8)
+    scaled = np.clip(np.multiply(rgb, scalefactor, dtype=float), 0, 255).astype(np.uint8).tobytes().hex()
+    return ['#' + scaled[i:i + 6] for i in range(0, len(scaled), 6)]
+
+_CURRENCY_SUFFIXES = ('', 'k', 'm', 'b', 't')
+
 
 def human_currency_format(num):
     num = float('{:.3g}'.format(num))
     magnitude = 0
-    while abs(num) >= 1000:
-        magnitude += 1
-        num /= 1000.0
-    return '{}{}'.format('{:f}'.format(num).rstrip('0').rstrip('.'), ['', 'k', 'm', 'b', 't'][magnitude])
+    if abs(num) >= 1000 and math.isfinite(num):
+        # one suffix step per factor of 1000, capped at trillions, e.g. 1.5e16 -> 15000t
+        magnitude = min(int(math.log10(abs(num))) // 3, len(_CURRENCY_SUFFIXES) - 1)
+        num /= 1000.0 ** magnitude
+    return '{}{}'.format('{:f}'.format(num).rstrip('0').rstrip('.'), _CURRENCY_SUFFIXES[magnitude])
+
 
 def currency_fmt_to_cols(cols):
     return lambda col: col.apply(human_currency_format) if col.name in cols else col